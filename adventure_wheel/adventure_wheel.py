@@ -1,10 +1,52 @@
 #!/usr/bin/env python3
 
-from os import get_terminal_size, listdir, system, walk
+import signal
+import sys
+from os import get_terminal_size, scandir, system
 from os import name as os_name
-from os.path import abspath, basename, isdir, join
-from time import sleep
-from typing import List
+from os.path import abspath, isdir
+from re import DOTALL
+from re import compile as re_compile
+from threading import current_thread, main_thread
+from time import perf_counter, sleep
+from typing import Dict, Iterator, List, Set, Tuple, Union
+
+# ANSI escape characters for each color marker
+_COLORS = {"r":"\033[31m", "g":"\033[32m", "b":"\033[34m",
+            "c":"\033[36m", "m":"\033[35m", "y":"\033[93m",
+            "d":"\033[0m"}
+# ANSI escape character for returning to the default terminal color
+_RESET = _COLORS["d"]
+# ANSI escape characters for each full color marker
+_MARK_TO_ANSI = {"{{" + color + "}}":ansi for color, ansi in _COLORS.items()}
+# SGR parameter of each ANSI color escape character
+_ANSI_TO_PARAM = {ansi:ansi[2:-1] for ansi in _COLORS.values()}
+# Shared ANSI escape character for each merged run of SGR parameters
+_MERGED_ANSI = {param:ansi for ansi, param in _ANSI_TO_PARAM.items()}
+# Every merged ANSI escape character, for telling lone escapes from text
+_ANSI_ESCAPES = set(_MERGED_ANSI.values())
+# Matches ANSI color escape characters mixed in with text
+_ANSI_RE = re_compile("(\033\\[[0-9;]*m)")
+# Matches color markers, capturing the color character
+_COLOR_RE = re_compile(r"\{\{([" + "".join(_COLORS) + r"])\}\}")
+# Matches info markers, including an unclosed marker at the end of the text
+_MARKER_RE = re_compile(r"(\{\{.*?(?:\}\}|\Z))", DOTALL)
+# Markers surrounding each line of decision text
+_DECISION_START = "{{0}}"
+_DECISION_END = "{{d}}"
+# Color markers for decision options that have and haven't been visited
+_VISITED_COLOR = "{{g}}"
+_UNVISITED_COLOR = "{{b}}"
+# Shortest delay worth sleeping for between writes, in seconds
+_MIN_SLEEP = 0.005
+# Cached width of the terminal in characters, None if not cached
+_TERM_WIDTH = None
+# Whether the cached terminal width is kept current by a SIGWINCH handler
+_RESIZE_HANDLED = False
+# Cached escaped blocks for recently printed text, keyed by arguments
+_ESCAPE_CACHE = {}
+# Maximum number of entries to keep in the escape cache
+_ESCAPE_CACHE_SIZE = 512
 
 def get_color(color:str=None) -> str:
     """
@@ -16,27 +58,18 @@ def get_color(color:str=None) -> str:
     :return: ANSI color character
     :rtype: str
     """
-    if color == "r":
-        # Red
-        return "\033[31m"
-    elif color == "g":
-        # Green
-        return "\033[32m"
-    elif color == "b":
-        # Blue
-        return "\033[34m"
-    elif color == "c":
-        # Cyan
-        return "\033[36m"
-    elif color == "m":
-        # Magenta
-        return "\033[35m"
-    elif color == "y":
-        # Bright Yellow
-        return "\033[93m"
-    else:
-        # Default
-        return "\033[0m"
+    # Return the default color if the color character is invalid or unknown
+    if not isinstance(color, str):
+        return _RESET
+    return _COLORS.get(color, _RESET)
+
+def _refresh_terminal_width(*args):
+    """
+    Caches the current width of the terminal for printing text.
+    Accepts and ignores signal handler arguments so it can be used on SIGWINCH.
+    """
+    global _TERM_WIDTH
+    _TERM_WIDTH = get_terminal_size()[0]
 
 def wait_for_key_press():
     """
@@ -53,6 +86,35 @@ def clear_screen():
     else:
         system("clear")
 
+def iter_file_list(directory:str=None) -> Iterator[List[str]]:
+    """
+    Yields text files in a given directory and its subdirectories as they are found.
+    Entries are listed as [AbsolutePath, Filename Minus Extension] in no set order.
+
+    :param directory: Directory in which to search for files, defaults to None
+    :type directory: str, optional
+    :return: Iterator of text files in the given directory
+    :rtype: Iterator[list[str]]
+    """
+    # Yield nothing if directory is invalid
+    if directory is None:
+        return
+    # Search the directory and its subdirectories for text files
+    dirs = [abspath(directory)]
+    while len(dirs) > 0:
+        try:
+            with scandir(dirs.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        # Search subdirectory later
+                        dirs.append(entry.path)
+                    elif entry.name.endswith(".txt") and entry.is_file():
+                        # Yield file, filename pair
+                        yield [entry.path, entry.name[:-4]]
+        except OSError:
+            # Skip directories that can't be read
+            continue
+
 def get_file_list(directory:str=None) -> List[List[str]]:
     """
     Returns a list of text files in a given directory and its subdirectories.
@@ -63,27 +125,8 @@ def get_file_list(directory:str=None) -> List[List[str]]:
     :return: List of text files in the given directory
     :rtype: list[list[str]]
     """
-    # Return empty list if directory is invalid
-    if directory is None:
-        return []
-    # Get all subdirectories within the given directory
-    dirs = []
-    path = abspath(directory)
-    for p in walk(path):
-        dirs.append(abspath(p[0]))
-    # Get list of text files
-    files = []
-    for folder in dirs:
-        for file in listdir(folder):
-            if str(file).endswith(".txt"):
-                files.append(abspath(join(folder, file)))
-    # Add basenames to get file, filename pair
-    files.sort()
-    pairs = []
-    for file in files:
-        pairs.append([str(file), basename(file)[:-4]])
-    # Return list of files
-    return pairs
+    # Return list of files sorted by path
+    return sorted(iter_file_list(directory))
 
 def read_file_as_lines(file:str=None) -> List[str]:
     """
@@ -97,24 +140,15 @@ def read_file_as_lines(file:str=None) -> List[str]:
     # Return empty list if given file is invalid
     if file is None:
         return []
-    # Read text file
+    # Read text file, carriage returns become new lines when read
     try:
         with open(file) as f:
             contents = f.read()
     except FileNotFoundError:
         # Return empty list if file doesn't exist
         return []
-    # Separate into separate lines
-    lines = contents.split("\n")
-    # Remove any carriage return characters
-    for i in range(0, len(lines)):
-        lines[i] = lines[i].replace("\r", "")
-    # Remove empty entries
-    for i in range(len(lines)-1, -1, -1):
-        if lines[i] == "":
-            del lines[i]
-    # Return lines
-    return lines
+    # Separate into lines, removing empty entries
+    return [line for line in contents.split("\n") if line]
 
 def split_markers(string:str=None) -> List[str]:
     """
@@ -128,33 +162,46 @@ def split_markers(string:str=None) -> List[str]:
     # Return empty string if parameters are invalid
     if string is None:
         return []
-    blocks = []
-    left = string
-    while len(left) > 0:
-        # Find first marker start if available
-        start = left.find("{{")
-        if start == -1:
-            start = len(left)
-        # Add non-marker if available
-        if start > 0:
-            blocks.append(left[:start])
-            left = left[start:]
-        # Add marker block if available
-        end = left.find("}}")
-        if end == -1:
-            end = len(left)
-        else:
-            end +=2
-        blocks.append(left[:end])
-        left = left[end:]
-    # Remove empty entries
-    size = len(blocks)
-    for i in range(0, size):
-        if blocks[i] == "":
-            del blocks[i]
-            i -= 1
-    # Return blocks
-    return blocks
+    # Split into markers and text in a single pass
+    blocks = _MARKER_RE.split(string)
+    # Remove empty entries and return blocks
+    return [block for block in blocks if block]
+
+def _split_plain_into_lines(string:str=None, width:int=5) -> List[str]:
+    """
+    Splits text without info markers into lines that fit the given width in characters.
+    Jumps ahead a full line at a time and backs up to the last space that fits.
+
+    :param string: String to devide into lines, defaults to None
+    :type string: str, optional
+    :param width: Maximum width of a line in characters, defaults to 5
+    :type width: int, optional
+    :return: List of divided string lines
+    :rtype: list[str]
+    """
+    # Return empty list if parameters are invalid
+    if width < 2 or string is None:
+        return []
+    lines = []
+    size = len(string)
+    start = 0
+    while size - start > width:
+        # Find the end of the first word, which always starts the line
+        first = string.find(" ", start)
+        if first == -1:
+            first = size
+        # Hyphenate the first word if it doesn't fit on one line
+        if first - start > width:
+            lines.append(string[start:start + width - 1] + "-")
+            start += width - 1
+            continue
+        # Break the line at the last space that fits
+        end = string.rfind(" ", first, start + width + 1)
+        lines.append(string[start:end])
+        start = end + 1
+    lines.append(string[start:])
+    # Remove empty lines and return lines
+    return [line for line in lines if line]
 
 def split_into_lines(string:str=None, width:int=5) -> List[str]:
     """
@@ -171,6 +218,12 @@ def split_into_lines(string:str=None, width:int=5) -> List[str]:
     # Return empty list if parameters are invalid
     if width < 2 or string is None:
         return []
+    # Wrap text directly if there are no markers to skip over
+    if "{{" not in string:
+        # Return text as is if it already fits on one line
+        if len(string) <= width:
+            return [string] if string else []
+        return _split_plain_into_lines(string, width)
     # Split out the speed and color markers
     blocks = split_markers(string)
     # Split text into sections based on spaces
@@ -183,49 +236,35 @@ def split_into_lines(string:str=None, width:int=5) -> List[str]:
         for i in range(1, size):
             words.append(" " + sections[i])
     # Set lines
-    lines = [""]
+    lines = []
+    cur = ""
     size = 0
-    while len(words) > 0:
-        # Check if line is already too long
-        if size > width:
-            size = (size - width) + 1
-            leftover = lines[-1][-1*size:]
-            lines[-1] = lines[-1][:-1*size] + "-"
-            lines.append(leftover)
-            continue
+    stride = width - 1
+    for word in words:
         # Add mark without counting towards line size if present
-        if words[0].startswith("{{"):
-            lines[-1] = lines[-1] + words[0]
-            del words[0]
+        if word.startswith("{{"):
+            cur = cur + word
             continue
-        # Check if current line is full
-        new_total = size + len(words[0])
-        if new_total > width:
-            # Create new line if line is too long
-            lines.append(words[0])
-            if lines[-1].startswith(" "):
-                lines[-1] = lines[-1][1:]
-            size = len(lines[-1])
-        else:
-            # Add word to line
-            lines[-1] = lines[-1] + words[0]
+        # Add word to line if it fits
+        new_total = size + len(word)
+        if new_total <= width:
+            cur = cur + word
             size = new_total
-        del words[0]
-    # Make sure last line isn't too long
-    while size > width:
-        size = (size - width) + 1
-        leftover = lines[-1][-1*size:]
-        lines[-1] = lines[-1][:-1*size] + "-"
-        lines.append(leftover)
-    # Remove empty lines
-    i = 0
-    while i < len(lines):
-        if lines[i] == "":
-            del lines[i]
             continue
-        i += 1
-    # Return lines
-    return lines
+        # Create new line if line is too long
+        lines.append(cur)
+        if word.startswith(" "):
+            word = word[1:]
+        cur = word
+        size = len(word)
+        # Hyphenate word in fixed strides if it doesn't fit on one line
+        while size > width:
+            lines.append(cur[:stride] + "-")
+            cur = cur[stride:]
+            size -= stride
+    lines.append(cur)
+    # Remove empty lines and return lines
+    return [line for line in lines if line]
 
 def replace_speed_markers(string:str=None, multiplier:float=1) -> str:
     """
@@ -242,27 +281,88 @@ def replace_speed_markers(string:str=None, multiplier:float=1) -> str:
     # Don't bother replacing markers if multiplyer is 1
     if multiplier == 1:
         return string
-    # Split into markers and non-markers
-    chunks = split_markers(string)
+    # Return empty string if string is invalid
+    if string is None:
+        return ""
+    # Don't bother replacing markers if there are none
+    if "{{" not in string:
+        return string
+    # Split into blocks, with markers landing on the odd indexes
+    blocks = _MARKER_RE.split(string)
     # Replace text speed markers using the multiplier
-    replaced = ""
-    for chunk in chunks:
-        if chunk.startswith("{{"):
+    scaled = {}
+    for i in range(1, len(blocks), 2):
+        marker = blocks[i]
+        # Only convert each distinct marker once
+        if marker not in scaled:
             try:
-                value = float(chunk[2:-2]) * multiplier
-                replaced = replaced + "{{" + str(value) + "}}"
+                value = float(marker[2:-2]) * multiplier
+                scaled[marker] = "{{" + str(value) + "}}"
             except ValueError:
-                replaced = replaced + chunk
-        else:
-            replaced = replaced + chunk
+                scaled[marker] = marker
+        blocks[i] = scaled[marker]
     # Returns the replaced string
-    return replaced
+    return "".join(blocks)
 
-def add_escapes(string:str=None, width:int=5,
+def _remove_speed_marker(block:str=None) -> str:
+    """
+    Sets the speed of a text speed marker to zero.
+    Blocks that aren't speed markers are returned unaltered.
+
+    :param block: Block as gotten from split_markers, defaults to None
+    :type block: str, optional
+    :return: Block with speed set to zero
+    :rtype: str
+    """
+    # Return block unaltered if it isn't a marker
+    if block is None or not block.startswith("{{"):
+        return block
+    # Set speed to zero if marker is a speed marker
+    try:
+        value = float(block[2:-2]) * 0
+        return "{{" + str(value) + "}}"
+    except ValueError:
+        return block
+
+def _merge_color_params(params:List[str]=None) -> str:
+    """
+    Returns a single ANSI escape character equivalent to a run of color escapes.
+    Colors overridden by later resets or colors in the run are dropped.
+
+    :param params: SGR parameters of the color escapes in order, defaults to None
+    :type params: list[str], optional
+    :return: Merged ANSI escape character
+    :rtype: str
+    """
+    # Return empty string if parameters are invalid
+    if params is None or len(params) == 0:
+        return ""
+    # Keep the last reset and the last color after it
+    kept = []
+    for param in params:
+        if param == "0":
+            kept = ["0"]
+        elif len(kept) > 0 and not kept[-1] == "0":
+            kept[-1] = param
+        else:
+            kept.append(param)
+    # Reuse the same escape character for each distinct merged run
+    joined = ";".join(kept)
+    merged = _MERGED_ANSI.get(joined)
+    if merged is None:
+        merged = sys.intern("\033[" + joined + "m")
+        _MERGED_ANSI[joined] = merged
+        _ANSI_ESCAPES.add(merged)
+    # Return merged escape character
+    return merged
+
+def _add_escapes_tokenized(string:str=None, width:int=5,
                 include_color:bool=True,
-                include_speed:bool=True) -> str:
+                include_speed:bool=True) -> Tuple[str, ...]:
     """
     Adds new line and color escape characters to a given string.
+    Returns the result already split into info markers and normal text.
+    Results are cached, so they are returned as a tuple that can't be modified.
 
     :param string: String to modify, defaults to None
     :type string: str, optional
@@ -272,51 +372,133 @@ def add_escapes(string:str=None, width:int=5,
     :type include_color: bool, optional
     :param include_speed: Whether to include variable text speed, defaults to True
     :type include_speed: bool, optional
-    :return: String with new line and color escape characters added
-    :rtype: str
+    :return: Text and info markers with escape characters added
+    :rtype: tuple[str]
+    """
+    # Return cached blocks if the same text was already escaped
+    key = (string, width, include_color, include_speed)
+    if key in _ESCAPE_CACHE:
+        return _ESCAPE_CACHE[key]
+    # Escape the text
+    merged = tuple(_escape_blocks(string, width, include_color, include_speed))
+    # Drop the oldest entry once the cache is full
+    if len(_ESCAPE_CACHE) >= _ESCAPE_CACHE_SIZE:
+        del _ESCAPE_CACHE[next(iter(_ESCAPE_CACHE))]
+    _ESCAPE_CACHE[key] = merged
+    # Return blocks with escape characters
+    return merged
+
+def _escape_blocks(string:str=None, width:int=5,
+                include_color:bool=True,
+                include_speed:bool=True) -> List[str]:
+    """
+    Adds new line and color escape characters to a given string without caching.
+    Returns the result already split into info markers and normal text.
+
+    :param string: String to modify, defaults to None
+    :type string: str, optional
+    :param width: Width of each line in characters, defaults to 5
+    :type width: int, optional
+    :param include_color: Whether to include color escape characters, defaults to True
+    :type include_color: bool, optional
+    :param include_speed: Whether to include variable text speed, defaults to True
+    :type include_speed: bool, optional
+    :return: List of text and info markers with escape characters added
+    :rtype: list[str]
     """
     # Split into lines
     lines = split_into_lines(string, width)
-    # Return empty string if lines are empty
+    # Return empty list if lines are empty
     if lines == []:
-        return ""
+        return []
     # Combine lines with new line characters
-    escaped = lines[0]
-    size = len(lines)
-    for i in range(1, size):
-        escaped = escaped + "\n" + lines[i]
-    # Replace color markers
-    if include_color:
-        escaped = escaped.replace("{{r}}", get_color("r"))
-        escaped = escaped.replace("{{g}}", get_color("g"))
-        escaped = escaped.replace("{{b}}", get_color("b"))
-        escaped = escaped.replace("{{c}}", get_color("c"))
-        escaped = escaped.replace("{{m}}", get_color("m"))
-        escaped = escaped.replace("{{y}}", get_color("y"))
-        escaped = escaped.replace("{{d}}", get_color("d"))
-    else:
-        escaped = escaped.replace("{{r}}", "")
-        escaped = escaped.replace("{{g}}", "")
-        escaped = escaped.replace("{{b}}", "")
-        escaped = escaped.replace("{{c}}", "")
-        escaped = escaped.replace("{{m}}", "")
-        escaped = escaped.replace("{{y}}", "")
-        escaped = escaped.replace("{{d}}", "")
-    # Remove speed markers if specified
+    escaped = "\n".join(lines)
+    # Return text as is if there are no markers to replace
+    if "{{" not in escaped:
+        if include_speed:
+            return [escaped]
+        return ["{{0}}", escaped]
+    # Split out markers, which always land at odd indexes between text blocks
+    blocks = _MARKER_RE.split(escaped)
+    # Bind table lookups locally for the block loops
+    to_ansi = _MARK_TO_ANSI.get
+    to_param = _ANSI_TO_PARAM.get
+    # Replace markers block by block, text blocks never contain markers
+    markers = []
+    resplit = False
+    for i in range(1, len(blocks), 2):
+        block = blocks[i]
+        ansi = to_ansi(block)
+        if ansi is not None:
+            # Replace plain color marker
+            blocks[i] = ansi if include_color else ""
+        elif _COLOR_RE.search(block):
+            # Replace color markers nested in other markers
+            if include_color:
+                blocks[i] = _COLOR_RE.sub(lambda match: to_ansi(match.group(0)), block)
+            else:
+                blocks[i] = _COLOR_RE.sub("", block)
+            resplit = True
+        else:
+            # Keep track of other markers in case they are speed markers
+            markers.append(i)
+    # Split again if replacing nested markers changed the marker boundaries
+    if resplit:
+        blocks = _MARKER_RE.split("".join(blocks))
+        markers = range(1, len(blocks), 2)
+    # Remove speed markers and start at full speed if specified
     if not include_speed:
-        escaped = "{{0}}" + replace_speed_markers(escaped, 0)
-    # Return text with escape characters
-    return escaped
+        for i in markers:
+            blocks[i] = _remove_speed_marker(blocks[i])
+        blocks.insert(0, "{{0}}")
+    # Merge runs of color escape characters and remove empty blocks
+    merged = []
+    params = []
+    for block in blocks:
+        if not block:
+            continue
+        param = to_param(block)
+        if param is not None:
+            params.append(param)
+            continue
+        if len(params) > 0:
+            merged.append(_merge_color_params(params))
+            params = []
+        merged.append(block)
+    if len(params) > 0:
+        merged.append(_merge_color_params(params))
+    # Return blocks with escape characters
+    return merged
+
+def add_escapes(string:str=None, width:int=5,
+                include_color:bool=True,
+                include_speed:bool=True) -> str:
+    """
+    Adds new line and color escape characters to a given string.
+
+    :param string: String to modify, defaults to None
+    :type string: str, optional
+    :param width: Width of each line in characters, defaults to 5
+    :type width: int, optional
+    :param include_color: Whether to include color escape characters, defaults to True
+    :type include_color: bool, optional
+    :param include_speed: Whether to include variable text speed, defaults to True
+    :type include_speed: bool, optional
+    :return: String with new line and color escape characters added
+    :rtype: str
+    """
+    return "".join(_add_escapes_tokenized(string, width,
+                include_color, include_speed))
 
-def get_characters(lines:List[str]=None) -> List[List]:
+def get_characters(lines:List[str]=None) -> List[tuple]:
     """
     Returns a list of character entries based list of strings read from characters file.
-    Character entries are returned as [variable-name(str), name(str), color(str), text-speed(float)]
+    Character entries are returned as (variable-name(str), name(str), color(str), text-speed(float))
 
     :param lines: Lines of text read from characters file, defaults to None
     :type lines: str, optional
     :return: List of character entries
-    :rtype: list[list]
+    :rtype: list[tuple]
     """
     # Return empty string if parameters are invalid
     if lines is None:
@@ -324,50 +506,67 @@ def get_characters(lines:List[str]=None) -> List[List]:
     characters = []
     # Run through each line
     for line in lines:
-        # split info in the line into sections
-        info = line.split("|")
-        # Skip character if number of entries is incorrect
-        if not len(info) == 4:
-            continue
-        # Get the variable name for the character
-        if info[0] == "":
-            continue
-        character = [str(info[0])]
-        # Get the character name
-        if info[1] == "":
+        # Split info in the line into sections, skipping if the number is incorrect
+        try:
+            var_name, name, color, speed = line.split("|", 4)
+        except ValueError:
             continue
-        character.append(str(info[1]))
-        # Get the character color
-        if not len(info[2]) == 1:
+        # Skip character if the variable name, name, or color are invalid
+        if var_name == "" or name == "" or not len(color) == 1:
             continue
-        character.append(str(info[2]))
         # Get the character text speed
         try:
-            character.append(float(info[3]))
+            speed = float(speed)
         except ValueError:
             continue
         # Append the character to the list of characters
-        characters.append(character)
+        characters.append((var_name, name, color, speed))
     # Return the list of characters
     return characters
 
+def get_character_map(chars:List[tuple]=None) -> Dict[str, tuple]:
+    """
+    Returns character entries indexed by their variable names.
+    If a variable name is repeated, the first character entry is used.
+
+    :param chars: Character list as gotten from get_characters(), defaults to None
+    :type chars: list[tuple], optional
+    :return: Character entries keyed by variable name
+    :rtype: dict[str, tuple]
+    """
+    # Return empty dict if parameters are invalid
+    if chars is None:
+        return {}
+    # Add characters by variable name
+    char_map = {}
+    for char in chars:
+        char_map.setdefault(char[0], char)
+    # Return the character map
+    return char_map
+
 def format_story_text(lines:List[str]=None,
-                chars:List[list]=None) -> List[str]:
+                chars:Union[List[tuple], Dict[str, tuple]]=None) -> List[str]:
     """
     Formats story text by adding character info and removing whitespace.
+    Characters can also be given as a dict keyed by variable name.
 
     :param lines: Lines read from a story text file, defaults to None
     :type lines: list[str], optional
     :param chars: Character list as gotten from get_characters(), defaults to None
-    :type chars: list[list], optional
+    :type chars: list[tuple] or dict[str, tuple], optional
     :return: List of formatted text in lines
     :rtype: list[str]
     """
     # Return empty list if parameters are invalid
     if lines is None or chars is None:
         return []
+    # Index characters by variable name
+    char_by_name = chars
+    if not isinstance(chars, dict):
+        char_by_name = get_character_map(chars)
     # Run through each line
     formatted = []
+    prefixes = {}
     prev_char = ""
     next_line = ""
     for line in lines:
@@ -381,25 +580,22 @@ def format_story_text(lines:List[str]=None,
                 next_line = line[1:-1]
             else:
                 # Split character var name and text
-                index = line.find("\"")
-                cur_char = line[:index]
-                text = line[index+1:-1]
+                cur_char, quote, text = line.partition("\"")
+                text = text[:-1]
                 # Get character information
-                character = None
-                for char in chars:
-                    if char[0] == cur_char:
-                        character = char
-                        break
+                character = char_by_name.get(cur_char)
                 if character is None:
                     formatted.append(line)
                     continue
+                # Build the name and speed prefix once per character
+                prefix = prefixes.get(cur_char)
+                if prefix is None:
+                    prefix = ("{{0}}{{" + character[2] + "}}" + character[1]
+                                + ": {{d}}{{" + str(character[3]) + "}}")
+                    prefixes[cur_char] = prefix
                 # Combine into text
                 text = replace_speed_markers(text, character[3])
-                final_text = "{{0}}{{" + character[2] + "}}"
-                final_text = final_text + character[1] + ": {{d}}"
-                final_text = final_text + "{{" + str(character[3]) + "}}"
-                final_text = final_text + text
-                next_line = final_text
+                next_line = prefix + text
         else:
             # Add current line unaltered if not quoted text
             next_line = line
@@ -409,10 +605,11 @@ def format_story_text(lines:List[str]=None,
         prev_char = cur_char
         formatted.append(next_line)
     # Remove empty lines from beginning of list
-    while len(formatted) > 0 and formatted[0] == "{{0}}":
-        del formatted[0]
+    start = 0
+    while start < len(formatted) and formatted[start] == "{{0}}":
+        start += 1
     # Return formatted list of text
-    return formatted
+    return formatted[start:]
 
 def print_by_char(string:str=None):
     """
@@ -423,11 +620,13 @@ def print_by_char(string:str=None):
     :type string: str, optional
     """
     # Add escape characters to text
-    width = get_terminal_size()[0]
-    escaped = add_escapes(string, width)
-    # Split into markers
-    blocks = split_markers(escaped)
+    width = _TERM_WIDTH
+    if width is None:
+        width = get_terminal_size()[0]
+    blocks = _add_escapes_tokenized(string, width)
     timeout = 0.02
+    write = sys.stdout.write
+    flush = sys.stdout.flush
     # Print character by character
     for block in blocks:
         if block.startswith("{{"):
@@ -436,13 +635,39 @@ def print_by_char(string:str=None):
             except ValueError:
                 timeout = 0.02
             continue
+        elif block in _ANSI_ESCAPES:
+            # Write lone escape characters along with the next character shown
+            write(block)
+        elif timeout <= 0:
+            # Write the whole block at once if there is no delay
+            write(block)
+            flush()
         else:
-            size = len(block)
-            for i in range(0, size):
-                print(block[i], end="", flush=True)
-                sleep(timeout)
+            # Write characters in groups long enough to be worth sleeping for
+            step = max(1, int(_MIN_SLEEP / timeout))
+            # Split out escape characters mixed in with the text, landing at odd indexes
+            pieces = [block]
+            if "\033" in block:
+                pieces = _ANSI_RE.split(block)
+            # Pace groups against a deadline to avoid drift
+            deadline = perf_counter()
+            for j in range(0, len(pieces)):
+                piece = pieces[j]
+                if j % 2 == 1:
+                    # Write escape characters along with the next character shown
+                    write(piece)
+                    continue
+                for i in range(0, len(piece), step):
+                    group = piece[i:i+step]
+                    write(group)
+                    flush()
+                    deadline += timeout * len(group)
+                    delay = deadline - perf_counter()
+                    if delay > 0:
+                        sleep(delay)
     # Move to a new line and reset default color
-    print(get_color("d"))
+    write(_RESET + "\n")
+    flush()
 
 def get_link_options(lines:List[str]=None, print_lines:bool=True) -> List[List[str]]:
     """
@@ -460,33 +685,27 @@ def get_link_options(lines:List[str]=None, print_lines:bool=True) -> List[List[s
     if lines is None:
         return []
     # Run through all lines
-    text = []
-    options = []
+    full_options = []
     for line in lines:
         if line.startswith("[[") and line.endswith("]]"):
-            # Add option to the list of options
-            options.append(line[2:-2])
+            # Add option to the list of options if it is complete
+            split = line[2:-2].split("|")
+            if len(split) == 2:
+                full_options.append(split)
+        elif not print_lines:
+            # Skip standard story text if not printing
+            continue
+        elif line == "{{0}}":
+            # Wait for the user between blocks of text
+            wait_for_key_press()
         else:
-            # Add standard story text to the list of text
-            text.append(line)
-    # Split into full options
-    full_options = []
-    for option in options:
-        split = option.split("|")
-        if len(split) == 2:
-            full_options.append(split)
-    # Print string if specified
-    if print_lines:
-        for line in text:
-            if line == "{{0}}":
-                wait_for_key_press()
-                continue
+            # Print standard story text
             print_by_char(line)
     # Return full options
     return full_options
 
 def get_decision_text(options:List[List[str]]=None,
-                visited_links:List[str]=None) -> List[str]:
+                visited_links:Union[List[str], Set[str]]=None) -> List[str]:
     """
     Returns text to show for the user to make a decision.
     Based on options list, formated [link, name]
@@ -494,48 +713,49 @@ def get_decision_text(options:List[List[str]]=None,
 
     :param options: Options list, defaults to None
     :type options: list[list[str]], optional
-    :param visited_links: List of link names that have been visited, defaults to None
-    :type visited_links: list[str], optional
+    :param visited_links: Link names that have been visited, defaults to None
+    :type visited_links: list[str] or set[str], optional
     :return: List of lines containing each option
     :rtype: list[str]
     """
     # Return empty list if options are invalid
     if options is None:
         return []
-    # Get colors based on whether links have been visited
-    colors = []
-    for option in options:
+    # Get set of visited links for fast lookup, treating invalid links as unvisited
+    visited = visited_links
+    if not isinstance(visited_links, (set, frozenset)):
         try:
-            link = option[0]
-            if link in visited_links:
-                # Set color to green if visited
-                colors.append("{{g}}")
-                continue      
-        except (IndexError, TypeError): pass
-        # Set color to blue if not visited or invalid
-        colors.append("{{b}}")
+            visited = {link for link in visited_links if isinstance(link, str)}
+        except TypeError:
+            visited = set()
     # Create text based on decisions available
     text = []
     link_num = 1
-    for i in range(0, len(options)):
-        try:
-            name = options[i][1]
-            text.append("{{0}}" + str(link_num) + ") " + colors[i] + name + "{{d}}")
-        except (IndexError, TypeError):
+    for option in options:
+        # Skip options without both a link and a name
+        if (not isinstance(option, (list, tuple)) or len(option) < 2
+                or not isinstance(option[1], str)):
             continue
+        # Set color to green if visited, blue if not or if the link is invalid
+        color = _UNVISITED_COLOR
+        if isinstance(option[0], str) and option[0] in visited:
+            color = _VISITED_COLOR
+        text.append(f"{_DECISION_START}{link_num}) {color}{option[1]}{_DECISION_END}")
         link_num += 1
     # Return the text
     return text
 
-def get_file_by_name(name:str=None, files:List[List[str]]=None) -> List[str]:
+def get_file_by_name(name:str=None,
+                files:Union[List[List[str]], Dict[str, str]]=None) -> List[str]:
     """
     Returns the contents of the text file in the file list with a given name.
     Name should not include the .txt extension.
+    Files can also be given as a dict of file paths keyed by name.
 
     :param name: Name to search for in file list, defaults to None
     :type name: str, optional
     :param files: List of files as gotten from get_file_list, defaults to None
-    :type files: list[list[str]]
+    :type files: list[list[str]] or dict[str, str]
     :return: Contents of the text file with given name.
     :rtype: list[str]
     """
@@ -544,25 +764,32 @@ def get_file_by_name(name:str=None, files:List[List[str]]=None) -> List[str]:
         return []
     # Get the path of the file with the given name
     path = None
-    for file in files:
-        if file[1] == name:
-            path = file[0]
-            break
+    if isinstance(files, dict):
+        path = files.get(name)
+    else:
+        for file in files:
+            if file[1] == name:
+                path = file[0]
+                break
     # Read the text file and return the contents
     lines = read_file_as_lines(path)
     return lines
 
-def get_next_story(lines:List[str]=None, characters:List[List[str]]=None) -> str:
+def get_next_story(lines:List[str]=None,
+                characters:Union[List[tuple], Dict[str, tuple]]=None) -> str:
     """
     Prints the next part of the story, and returns which choice the user picked.
 
     :param lines: Lines of story text to print, defaults to None
     :type lines: list[str], optional
-    :param characters: Character info as gotten from get_characters, defaults to None
-    :type characters: list[list[str]]
+    :param characters: Character info as gotten from get_characters or get_character_map, defaults to None
+    :type characters: list[tuple] or dict[str, tuple]
     :return: File name of the option chosen by the user, without extension
     :rtype: str
     """
+    # Refresh terminal width if it isn't being updated on resize
+    if not _RESIZE_HANDLED:
+        _refresh_terminal_width()
     # Format the story text
     new_lines = format_story_text(lines, characters)
     # Get link options and print text
@@ -570,7 +797,7 @@ def get_next_story(lines:List[str]=None, characters:List[List[str]]=None) -> str
     # Print decision text, if necessary
     if len(options) > 1:
         print()
-        decision_lines = get_decision_text(options, [])
+        decision_lines = get_decision_text(options, set())
         for line in decision_lines:
             print_by_char(line)
     # Return empty string if there are no options to choose
@@ -581,12 +808,23 @@ def get_next_story(lines:List[str]=None, characters:List[List[str]]=None) -> str
     if len(options) > 1:
         decision = None
         while decision is None:
+            sys.stdout.write("> ")
+            sys.stdout.flush()
+            line = sys.stdin.readline()
+            # Stop if input has ended, as input() would
+            if line == "":
+                raise EOFError
+            # Only accept numbers for available options
+            line = line.strip()
+            if not line.isdecimal():
+                continue
             try:
-                decision = int(input("> ")) - 1
-                if decision < 0 or decision > (len(options)-1):
-                    decision = None
+                number = int(line)
             except ValueError:
-                decision = None
+                # Skip numbers too long to convert
+                continue
+            if 0 < number <= len(options):
+                decision = number - 1
         clear_screen()
     else:
         print()
@@ -605,8 +843,10 @@ def load_story(directory:str=None) -> bool:
     # Return False if directory is invalid
     if directory is None or not isdir(directory):
         return False
-    # Get list of story files
-    files = get_file_list(directory)
+    # Get story files by name, keeping the first file for duplicate names
+    files = {}
+    for file in get_file_list(directory):
+        files.setdefault(file[1], file[0])
     # Read character file
     lines = get_file_by_name("characters", files)
     characters = get_characters(lines)
@@ -614,11 +854,33 @@ def load_story(directory:str=None) -> bool:
     if characters == []:
         print("Invalid character file.")
         return False
-    # Start running the story
-    clear_screen()
-    next_story = "start"
-    while not next_story == "":
-        lines = get_file_by_name(next_story, files)
-        next_story = get_next_story(lines, characters)
+    # Index characters by variable name for the whole story
+    characters = get_character_map(characters)
+    # Cache terminal width, updating it whenever the terminal is resized
+    # Signal handlers can only be set from the main thread
+    global _RESIZE_HANDLED, _TERM_WIDTH
+    _refresh_terminal_width()
+    installed = False
+    if (hasattr(signal, "SIGWINCH") and not _RESIZE_HANDLED
+                and current_thread() is main_thread()):
+        previous = signal.signal(signal.SIGWINCH, _refresh_terminal_width)
+        installed = True
+        _RESIZE_HANDLED = True
+    try:
+        # Start running the story
+        clear_screen()
+        next_story = "start"
+        while not next_story == "":
+            lines = get_file_by_name(next_story, files)
+            next_story = get_next_story(lines, characters)
+    finally:
+        # Stop using the cached terminal width outside of the story
+        _TERM_WIDTH = None
+        # Restore the previous resize handler
+        if installed:
+            _RESIZE_HANDLED = False
+            if previous is None:
+                previous = signal.SIG_DFL
+            signal.signal(signal.SIGWINCH, previous)
     # Return True once story has completed
     return True
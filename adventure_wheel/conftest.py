@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+
+from pytest import fixture
+
+@fixture(scope="module")
+def test_dir(tmp_path_factory) -> str:
+    """
+    Creates and returns a test directory shared by the tests in a module.
+
+    :param tmp_path_factory: Pytest factory for temporary directories
+    :type tmp_path_factory: pytest.TempPathFactory
+    :return: File path of the test directory
+    :rtype: str
+    """
+    return str(tmp_path_factory.mktemp("advwheel_test"))
@@ -2,33 +2,45 @@
 
 from adventure_wheel.adventure_wheel import add_escapes
 from adventure_wheel.adventure_wheel import format_story_text
+from adventure_wheel.adventure_wheel import get_character_map
 from adventure_wheel.adventure_wheel import get_characters
 from adventure_wheel.adventure_wheel import get_color
 from adventure_wheel.adventure_wheel import get_decision_text
 from adventure_wheel.adventure_wheel import get_file_by_name
 from adventure_wheel.adventure_wheel import get_file_list
 from adventure_wheel.adventure_wheel import get_link_options
+from adventure_wheel.adventure_wheel import get_next_story
+from adventure_wheel.adventure_wheel import iter_file_list
+from adventure_wheel.adventure_wheel import load_story
+from adventure_wheel.adventure_wheel import print_by_char
 from adventure_wheel.adventure_wheel import read_file_as_lines
 from adventure_wheel.adventure_wheel import replace_speed_markers
 from adventure_wheel.adventure_wheel import split_into_lines
 from adventure_wheel.adventure_wheel import split_markers
-from os import mkdir, pardir
+import signal
+from io import StringIO
+from os import mkdir, pardir, terminal_size
 from os.path import abspath, basename, exists, join
-from tempfile import gettempdir
-from shutil import rmtree
+from pytest import raises
+from threading import Thread
 
-def get_test_dir() -> str:
+def create_test_file(directory:str, filename:str, contents:str) -> str:
     """
-    Creates and returns test directory.
+    Creates a test file with given contents.
 
-    :return: File path of the test directory
+    :param directory: Directory in which to create the file
+    :type directory: str
+    :param filename: Name of the file to create
+    :type filename: str
+    :param contents: Text to write to the file
+    :type contents: str
+    :return: File path of the created file
     :rtype: str
     """
-    test_dir = abspath(join(abspath(gettempdir()), "advwheel_test"))
-    if(exists(test_dir)):
-        rmtree(test_dir)
-    mkdir(test_dir)
-    return test_dir
+    path = join(directory, filename)
+    with open(path, "w") as out_file:
+        out_file.write(contents)
+    return path
 
 def test_get_color():
     """
@@ -46,6 +58,7 @@ def test_get_color():
     assert get_color(None) == "\033[0m"
     assert get_color("blah") == "\033[0m"
     assert get_color("") == "\033[0m"
+    assert get_color(["r"]) == "\033[0m"
     assert get_color() == "\033[0m"
 
 def test_split_markers():
@@ -69,6 +82,12 @@ def test_split_markers():
     assert marks == ["A", "{{b}}", " c ", "{{D}"]
     marks = split_markers("Thing}} and {{d}}stuff")
     assert marks == ["Thing}} and ", "{{d}}", "stuff"]
+    # Test separating marks that contain other marks
+    marks = split_markers("A{{b{{c}}d}}e")
+    assert marks == ["A", "{{b{{c}}", "d}}e"]
+    # Test separating marks across multiple lines
+    marks = split_markers("{{g}}One\nTwo {{1\n.5}}\nThree")
+    assert marks == ["{{g}}", "One\nTwo ", "{{1\n.5}}", "\nThree"]
     # Test separating marks with invalid parameters
     assert split_markers("") == []
     assert split_markers(None) == []
@@ -91,6 +110,14 @@ def test_split_into_lines():
     assert lines == ["This", "humong-", "ous bit", "is just", "too", "length-", "y."]
     lines = split_into_lines("Absolutely totally redicoulonculous.", 8)
     assert lines == ["Absolut-", "ely", "totally", "redicou-", "lonculo-", "us."]
+    # Test text that already fits on one line
+    assert split_into_lines("Some words", 10) == ["Some words"]
+    assert split_into_lines("Short", 10) == ["Short"]
+    # Test splitting text with repeated spaces
+    lines = split_into_lines("Some  spaced   out words", 6)
+    assert lines == ["Some ", "spaced", "  out", "words"]
+    lines = split_into_lines("Some  {{g}}spaced   out words", 6)
+    assert lines == ["Some  {{g}}", "spaced", "  out", "words"]
     # Test splitting lines with invalid parameters
     assert split_into_lines("This is a sentence", 0) == []
     assert split_into_lines("This is a sentence", 1) == []
@@ -113,6 +140,11 @@ def test_add_escapes():
     assert escaped == "\033[36mWord\033[35mThings\033[93mstuff"
     escaped = add_escapes("{{d}}More {{r}}stuff.{{d}}", 30)
     assert escaped == "\033[0mMore \033[31mstuff.\033[0m"
+    # Test merging consecutive color markers
+    escaped = add_escapes("{{d}}{{b}}Word{{r}}{{g}}s{{r}}{{d}}", 40)
+    assert escaped == "\033[0;34mWord\033[32ms\033[0m"
+    escaped = add_escapes("{{g}}{{d}}{{d}}Words{{d}}{{0.5}}{{y}}", 40)
+    assert escaped == "\033[0mWords\033[0m{{0.5}}\033[93m"
     # Test replacing markers with new lines
     escaped = add_escapes("Some {{g}}words and stuff", 10)
     assert escaped == "Some \033[32mwords\nand stuff"
@@ -133,6 +165,33 @@ def test_add_escapes():
     assert add_escapes(None, 10) == ""
     assert add_escapes(width=10) == ""
 
+def test_escape_cache(monkeypatch):
+    """
+    Tests caching of text with escape characters added.
+    """
+    # Use a small, empty cache
+    module = "adventure_wheel.adventure_wheel."
+    monkeypatch.setattr(module + "_ESCAPE_CACHE", {})
+    monkeypatch.setattr(module + "_ESCAPE_CACHE_SIZE", 3)
+    from adventure_wheel.adventure_wheel import _ESCAPE_CACHE
+    # Test that repeated calls give the same output
+    text = "{{r}}Some {{2}}words"
+    escaped = add_escapes(text, 40)
+    assert escaped == "\033[31mSome {{2}}words"
+    assert add_escapes(text, 40) == escaped
+    assert len(_ESCAPE_CACHE) == 1
+    # Test that each set of parameters is cached separately
+    assert add_escapes(text, 5) == "\033[31mSome {{2}}\nwords"
+    assert add_escapes(text, 40, include_color=False) == "Some {{2}}words"
+    assert len(_ESCAPE_CACHE) == 3
+    # Test that the oldest entry is dropped once the cache is full
+    assert add_escapes(text, 40, include_speed=False) == "{{0}}\033[31mSome {{0.0}}words"
+    assert len(_ESCAPE_CACHE) == 3
+    assert not (text, 40, True, True) in _ESCAPE_CACHE
+    assert (text, 40, True, False) in _ESCAPE_CACHE
+    # Test that cached entries can't be modified by callers
+    assert all(isinstance(blocks, tuple) for blocks in _ESCAPE_CACHE.values())
+
 def test_get_characters():
     """
     Tests the get_characters function.
@@ -140,34 +199,52 @@ def test_get_characters():
     # Test getting characters with valid formatting
     chars = get_characters(["jn|John|b|1", "mg|Megan|y|0.5", "un|Unknown|m|2"])
     assert len(chars) == 3
-    assert chars[0] == ["jn", "John", "b", 1]
-    assert chars[1] == ["mg", "Megan", "y", 0.5]
-    assert chars[2] == ["un", "Unknown", "m", 2]
+    assert chars[0] == ("jn", "John", "b", 1)
+    assert chars[1] == ("mg", "Megan", "y", 0.5)
+    assert chars[2] == ("un", "Unknown", "m", 2)
     # Test getting characters with incorrect number of entries
     chars = get_characters(["John", "", "p|person", "mk|Mike|b|3", "b|Blah|thing|1|other"])
     assert len(chars) == 1
-    assert chars[0] == ["mk", "Mike", "b", 3]
+    assert chars[0] == ("mk", "Mike", "b", 3)
     # Test getting characters with invalid variable name
     chars = get_characters(["j|James|g|1.0", "|Person|r|4"])
     assert len(chars) == 1
-    assert chars[0] == ["j", "James", "g", 1]
+    assert chars[0] == ("j", "James", "g", 1)
     # Test getting characters with invalid name
     chars = get_characters(["bl||r|0.25", "mk|Mike|m|0.125"])
     assert len(chars) == 1
-    assert chars[0] == ["mk", "Mike", "m", 0.125]
+    assert chars[0] == ("mk", "Mike", "m", 0.125)
     # Test getting characters with invalid color code
     chars = get_characters(["ps|Person|green|2", "j|Joe|r|2", "l|Liz||3"])
     assert len(chars) == 1
-    assert chars[0] == ["j", "Joe", "r", 2]
+    assert chars[0] == ("j", "Joe", "r", 2)
     # Test getting characters with invalid text speed
     chars = get_characters(["jn|John|b|notnumber", "mk|Mike|r|", "s|Susan|g|3"])
     assert len(chars) == 1
-    assert chars[0] == ["s", "Susan", "g", 3]
+    assert chars[0] == ("s", "Susan", "g", 3)
     # Test getting characters with invalid parameters
     assert get_characters([]) == []
     assert get_characters(None) == []
     assert get_characters() == []
 
+def test_get_character_map():
+    """
+    Tests the get_character_map function.
+    """
+    # Test getting characters by variable name
+    chars = [("jn", "John", "b", 1.0), ("lz", "Liz", "g", 2.0)]
+    char_map = get_character_map(chars)
+    assert char_map == {"jn":("jn", "John", "b", 1.0), "lz":("lz", "Liz", "g", 2.0)}
+    # Test that the first character is used for repeated variable names
+    chars.append(("jn", "Other", "r", 3.0))
+    char_map = get_character_map(chars)
+    assert len(char_map) == 2
+    assert char_map["jn"] == ("jn", "John", "b", 1.0)
+    # Test getting characters with invalid parameters
+    assert get_character_map([]) == {}
+    assert get_character_map(None) == {}
+    assert get_character_map() == {}
+
 def test_replace_multipliers():
     """
     Tests the replace_multipliers function.
@@ -189,6 +266,9 @@ def test_replace_multipliers():
     assert text == "{{2.0}}Word {{"
     text = replace_speed_markers("}} {{b}}Thing{{1.25}}.", 2)
     assert text == "}} {{b}}Thing{{2.5}}."
+    # Test replacing speed markers inside of other markers
+    text = replace_speed_markers("{{x{{2}}Words{{-1}}", 2)
+    assert text == "{{x{{2}}Words{{-2.0}}"
     # Test replacing speed markers with multiplier of 1
     text = replace_speed_markers("{{1}}Thing{{2}}Other{{2.4}}", 1)
     assert text == "{{1}}Thing{{2}}Other{{2.4}}"
@@ -211,7 +291,7 @@ def test_format_story_text():
     story = format_story_text(["No quotes", "Only text"], [])
     assert story == ["No quotes", "Only text"]
     # Test formatting text with multiple characters
-    chars = [["jn", "John", "b", 1.0], ["lz", "Liz", "g", 2.0]]
+    chars = [("jn", "John", "b", 1.0), ("lz", "Liz", "g", 2.0)]
     story = format_story_text(["lz\"Words!\"", "lz\"Other {{0.5}}words\""], chars)
     assert len(story) == 2
     assert story[0] == "{{0}}{{g}}Liz: {{d}}{{2.0}}Words!"
@@ -226,6 +306,10 @@ def test_format_story_text():
     assert story[5] == "{{0}}"
     assert story[6] == "{{0}}{{b}}John: {{d}}{{1.0}}Thing"
     assert len(story) == 7
+    # Test formatting text with characters indexed by variable name
+    story = format_story_text(["lz\"Words!\"", "jn\"Thing\""], get_character_map(chars))
+    assert story == ["{{0}}{{g}}Liz: {{d}}{{2.0}}Words!", "{{0}}",
+                "{{0}}{{b}}John: {{d}}{{1.0}}Thing"]
     # Test formatting text with incomplete quotations
     story = format_story_text(["\"Incomplete line.", "Another incomplete\""], [])
     assert story == ["\"Incomplete line.", "Another incomplete\""]
@@ -247,6 +331,43 @@ def test_format_story_text():
     assert format_story_text(["Word"], None) == []
     assert format_story_text() == []
 
+def test_print_by_char(monkeypatch):
+    """
+    Tests the print_by_char function.
+    """
+    # Record writes and sleeps in order instead of printing and waiting
+    events = []
+    class Output:
+        def write(self, text:str):
+            events.append(text)
+        def flush(self):
+            pass
+    module = "adventure_wheel.adventure_wheel."
+    monkeypatch.setattr("sys.stdout", Output())
+    monkeypatch.setattr(module + "sleep", lambda delay: events.append(None))
+    monkeypatch.setattr(module + "perf_counter", lambda: 0)
+    monkeypatch.setattr(module + "_TERM_WIDTH", 40)
+    # Test that lone escape characters are written without waiting
+    print_by_char("{{r}}Hi")
+    assert events == ["\033[31m", "H", None, "i", None, "\033[0m\n"]
+    # Test that text after escape characters in the same block is still paced
+    events.clear()
+    print_by_char("{{r}}Hello there{{x{{g}}}}")
+    assert events[:5] == ["\033[31m", "H", None, "e", None]
+    assert events.count(None) == len("Hello there")
+    # Test that text with no delay is written all at once
+    events.clear()
+    print_by_char("{{0}}Hello there")
+    assert events == ["Hello there", "\033[0m\n"]
+    # Test that characters are grouped to keep sleeps above the minimum
+    events.clear()
+    print_by_char("{{0.1}}Hello")
+    assert events == ["He", None, "ll", None, "o", None, "\033[0m\n"]
+    # Test printing with invalid parameters
+    events.clear()
+    print_by_char(None)
+    assert events == ["\033[0m\n"]
+
 def test_get_link_options():
     """
     Tests the get_link_options function.
@@ -289,6 +410,9 @@ def test_get_decision_text():
     assert text[0] == "{{0}}1) {{g}}Path 1{{d}}"
     assert text[1] == "{{0}}2) {{b}}Path 2{{d}}"
     assert text[2] == "{{0}}3) {{b}}Path 3{{d}}"
+    # Test getting decision text with visited links as a set
+    text = get_decision_text(options, set(visited))
+    assert text == ["{{0}}1) {{g}}Path 1{{d}}", "{{0}}2) {{b}}Path 2{{d}}", "{{0}}3) {{b}}Path 3{{d}}"]
     # Test getting decision text with invalid option links
     options.append([])
     options.append(None)
@@ -300,6 +424,8 @@ def test_get_decision_text():
     assert text[1] == "{{0}}2) {{b}}Path 2{{d}}"
     assert text[2] == "{{0}}3) {{b}}Path 3{{d}}"
     assert text[3] == "{{0}}4) {{g}}Valid{{d}}"
+    assert get_decision_text([5, ["link", "Path"]], visited) == ["{{0}}1) {{g}}Path{{d}}"]
+    assert get_decision_text([[["link"], "Path"]], visited) == ["{{0}}1) {{b}}Path{{d}}"]
     # Test getting desicion text with invalid visited links
     text = text = get_decision_text(options, None)
     assert len(text) == 4
@@ -307,16 +433,20 @@ def test_get_decision_text():
     assert text[1] == "{{0}}2) {{b}}Path 2{{d}}"
     assert text[2] == "{{0}}3) {{b}}Path 3{{d}}"
     assert text[3] == "{{0}}4) {{b}}Valid{{d}}"
+    assert get_decision_text([["link", "Path"]], 5) == ["{{0}}1) {{b}}Path{{d}}"]
+    assert get_decision_text([["link", "Path"]], [["link"]]) == ["{{0}}1) {{b}}Path{{d}}"]
+    assert get_decision_text([["link", "Path"]], [["u"], "link"]) == ["{{0}}1) {{g}}Path{{d}}"]
     # Test getting desision text with invalid parameters
     assert get_decision_text([], visited) == []
     assert get_decision_text(None, visited) == []
 
-def test_get_file_list():
+def test_get_file_list(test_dir:str):
     """
     Tests the get_file_list function.
     """
     # Create test directories
-    test_dir = get_test_dir()
+    test_dir = abspath(join(test_dir, "files"))
+    mkdir(test_dir)
     main_sub = abspath(join(test_dir, "sub"))
     mkdir(main_sub)
     inner_one = abspath(join(main_sub, "one"))
@@ -324,21 +454,11 @@ def test_get_file_list():
     inner_two = abspath(join(main_sub, "two"))
     mkdir(inner_two)
     # Create test files
-    inner_file = abspath(join(inner_one, "inner.txt"))
-    with open(inner_file, "w") as out_file:
-        out_file.write("TEST")
-    other_file = abspath(join(inner_one, "other.txt"))
-    with open(other_file, "w") as out_file:
-        out_file.write("TEST")
-    not_text = abspath(join(inner_two, "not_text.png"))
-    with open(not_text, "w") as out_file:
-        out_file.write("TEST")
-    sub_text = abspath(join(main_sub, "sub_text.txt"))
-    with open(sub_text, "w") as out_file:
-        out_file.write("TEST")
-    main_text = abspath(join(test_dir, "main_text.txt"))
-    with open(main_text, "w") as out_file:
-        out_file.write("TEST")
+    inner_file = create_test_file(inner_one, "inner.txt", "TEST")
+    other_file = create_test_file(inner_one, "other.txt", "TEST")
+    not_text = create_test_file(inner_two, "not_text.png", "TEST")
+    sub_text = create_test_file(main_sub, "sub_text.txt", "TEST")
+    main_text = create_test_file(test_dir, "main_text.txt", "TEST")
     # Test that files were created
     assert exists(inner_file)
     assert exists(other_file)
@@ -380,21 +500,41 @@ def test_get_file_list():
     assert get_file_list(None) == []
     assert get_file_list() == []
 
-def test_read_file_as_lines():
+def test_iter_file_list(test_dir:str):
+    """
+    Tests the iter_file_list function.
+    """
+    # Create test files
+    test_dir = abspath(join(test_dir, "iter"))
+    mkdir(test_dir)
+    sub_dir = abspath(join(test_dir, "sub"))
+    mkdir(sub_dir)
+    main_text = create_test_file(test_dir, "main.txt", "TEST")
+    sub_text = create_test_file(sub_dir, "sub.txt", "TEST")
+    create_test_file(sub_dir, "image.png", "TEST")
+    # Test iterating over files in subfolders
+    files = iter_file_list(test_dir)
+    assert not isinstance(files, list)
+    files = sorted(files)
+    assert files == [[main_text, "main"], [sub_text, "sub"]]
+    assert files == get_file_list(test_dir)
+    # Test iterating over files from non-existant folder
+    non_dir = abspath(join(test_dir, "non_dir"))
+    assert list(iter_file_list(non_dir)) == []
+    # Test iterating over files with invalid parameters
+    assert list(iter_file_list(None)) == []
+    assert list(iter_file_list()) == []
+
+def test_read_file_as_lines(test_dir:str):
     """
     Tests the read_file_as_lines function.
     """
     # Create test files
-    test_dir = get_test_dir()
-    one_line = abspath(join(test_dir, "one.txt"))
-    with open(one_line, "w") as out_file:
-        out_file.write("text")
-    multiline = abspath(join(test_dir, "multi.txt"))
-    with open(multiline, "w") as out_file:
-        out_file.write("Line One\nNext\nThird")
-    carriage = abspath(join(test_dir, "carriage.txt"))
-    with open(carriage, "w") as out_file:
-        out_file.write("Carriage\r\nReturn\n\rThings\r")
+    test_dir = abspath(join(test_dir, "read"))
+    mkdir(test_dir)
+    one_line = create_test_file(test_dir, "one.txt", "text")
+    multiline = create_test_file(test_dir, "multi.txt", "Line One\nNext\nThird")
+    carriage = create_test_file(test_dir, "carriage.txt", "Carriage\r\nReturn\n\rThings\r")
     # Test that files were created
     assert exists(one_line)
     assert exists(multiline)
@@ -415,21 +555,16 @@ def test_read_file_as_lines():
     assert read_file_as_lines(None) == []
     assert read_file_as_lines() == []
 
-def test_get_file_by_name():
+def test_get_file_by_name(test_dir:str):
     """
     Tests the get_file_by_name function.
     """
     # Create test files
-    test_dir = get_test_dir()
-    one_line = abspath(join(test_dir, "one.txt"))
-    with open(one_line, "w") as out_file:
-        out_file.write("text")
-    multiline = abspath(join(test_dir, "multi.txt"))
-    with open(multiline, "w") as out_file:
-        out_file.write("Line One\nNext\nThird")
-    carriage = abspath(join(test_dir, "carriage.txt"))
-    with open(carriage, "w") as out_file:
-        out_file.write("Carriage\r\nReturn\n\rThings\r")
+    test_dir = abspath(join(test_dir, "by_name"))
+    mkdir(test_dir)
+    one_line = create_test_file(test_dir, "one.txt", "text")
+    multiline = create_test_file(test_dir, "multi.txt", "Line One\nNext\nThird")
+    carriage = create_test_file(test_dir, "carriage.txt", "Carriage\r\nReturn\n\rThings\r")
     # Test that files were created
     assert exists(one_line)
     assert exists(multiline)
@@ -442,6 +577,11 @@ def test_get_file_by_name():
     assert lines == ["Line One", "Next", "Third"]
     lines = get_file_by_name("carriage", files)
     assert lines == ["Carriage", "Return", "Things"]
+    # Test getting file by name from a dict of files
+    file_map = {"one":one_line, "multi":multiline}
+    assert get_file_by_name("one", file_map) == ["text"]
+    assert get_file_by_name("multi", file_map) == ["Line One", "Next", "Third"]
+    assert get_file_by_name("carriage", file_map) == []
     # Test getting file if name isn't included
     lines = get_file_by_name("not_included", files)
     assert lines == []
@@ -454,3 +594,79 @@ def test_get_file_by_name():
     assert get_file_by_name(None, files) == []
     assert get_file_by_name(None, None) == []
     assert get_file_by_name("", files) == []
+
+def test_get_next_story(monkeypatch):
+    """
+    Tests the get_next_story function.
+    """
+    # Print story text without clearing the screen or waiting
+    module = "adventure_wheel.adventure_wheel."
+    monkeypatch.setattr(module + "clear_screen", lambda: None)
+    monkeypatch.setattr(module + "sleep", lambda delay: None)
+    monkeypatch.setattr(module + "get_terminal_size", lambda: terminal_size((40, 20)))
+    monkeypatch.setattr(module + "_TERM_WIDTH", None)
+    lines = ["Some text", "[[left|Go left]]", "[[right|Go right]]"]
+    # Test choosing an option
+    monkeypatch.setattr("sys.stdin", StringIO("2\n"))
+    assert get_next_story(lines, []) == "right"
+    # Test that invalid entries are asked for again
+    entries = ["", "abc", "-1", "0", "3", "1.0", "1" * 5000, " 1 "]
+    monkeypatch.setattr("sys.stdin", StringIO("\n".join(entries) + "\n"))
+    assert get_next_story(lines, []) == "left"
+    # Test that the end of input stops the decision
+    monkeypatch.setattr("sys.stdin", StringIO("abc\n"))
+    with raises(EOFError):
+        get_next_story(lines, [])
+    # Test stories with a single option or no options
+    monkeypatch.setattr("sys.stdin", StringIO(""))
+    assert get_next_story(["Text", "[[next|Next]]"], []) == "next"
+    assert get_next_story(["The end"], []) == ""
+
+def test_load_story(test_dir:str, monkeypatch, capsys):
+    """
+    Tests the load_story function.
+    """
+    # Create test story files
+    story_dir = abspath(join(test_dir, "story"))
+    mkdir(story_dir)
+    create_test_file(story_dir, "characters.txt", "jn|John|b|0")
+    create_test_file(story_dir, "start.txt", "jn\"Hi there\"")
+    # Run the story without clearing the screen or waiting
+    module = "adventure_wheel.adventure_wheel."
+    monkeypatch.setattr(module + "clear_screen", lambda: None)
+    monkeypatch.setattr(module + "sleep", lambda delay: None)
+    monkeypatch.setattr(module + "get_terminal_size", lambda: terminal_size((40, 20)))
+    assert load_story(story_dir)
+    assert "John: " in capsys.readouterr().out
+    # Test that the cached terminal width isn't used after the story ends
+    monkeypatch.setattr(module + "get_terminal_size", lambda: terminal_size((10, 20)))
+    print_by_char("Some words and stuff.")
+    assert "Some words\nand stuff." in capsys.readouterr().out
+    # Test that the resize handler is only set while the story is running
+    if hasattr(signal, "SIGWINCH"):
+        def handler(*args):
+            pass
+        handlers = []
+        def next_story(lines, characters):
+            handlers.append(signal.getsignal(signal.SIGWINCH))
+            return ""
+        monkeypatch.setattr(module + "get_next_story", next_story)
+        previous = signal.signal(signal.SIGWINCH, handler)
+        try:
+            assert load_story(story_dir)
+            assert not handlers[0] is handler
+            assert signal.getsignal(signal.SIGWINCH) is handler
+            # Test running the story outside of the main thread
+            results = []
+            thread = Thread(target=lambda: results.append(load_story(story_dir)))
+            thread.start()
+            thread.join()
+            assert results == [True]
+            assert handlers[1] is handler
+            assert signal.getsignal(signal.SIGWINCH) is handler
+        finally:
+            signal.signal(signal.SIGWINCH, previous)
+    # Test loading story with invalid parameters
+    assert not load_story(abspath(join(story_dir, "non-existant")))
+    assert not load_story(None)
+    assert not load_story()